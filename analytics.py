@@ -1,58 +1,138 @@
+import time
+
 import numpy as np
 import pandas as pd
 from statsmodels.tsa.stattools import adfuller
-from sklearn.linear_model import HuberRegressor, TheilSenRegressor
-from pykalman import KalmanFilter
-import statsmodels.api as sm
+from numba import njit, types
+
+# signature variants for the eager-compiled numba kernels below: explicit
+# signatures compile at import (and cache to disk) instead of JIT-spiking the
+# first dashboard refresh, but each array argument must be registered in a
+# read-only variant too - Series.to_numpy() hands back read-only views under
+# pandas Copy-on-Write, and a writable-only signature refuses those
+_f8_1d = (types.f8[::1], types.Array(types.f8, 1, 'C', readonly=True))
 
 
 def stats(df):
+    # pull the column out once - five separate Series reductions meant five
+    # passes through pandas dispatch over the same data
+    a = df['price'].to_numpy(dtype=np.float64)
     return {
-        'last_price': df['price'].iloc[-1],
-        'mean': df['price'].mean(),
-        'std': df['price'].std(),
-        'min': df['price'].min(),
-        'max': df['price'].max()
+        'last_price': a[-1],
+        'mean': a.mean(),
+        'std': a.std(ddof=1),  # ddof=1 to match the old Series.std()
+        'min': a.min(),
+        'max': a.max()
         # 'volume': df['qty'].sum()
     }
 
 
 def ols_ratio(x, y): # tells how x moves w.r.t y or vice versa
-    x = sm.add_constant(x)
-    model = sm.OLS(y, x, missing='drop').fit()
-    beta = model.params[1]
-    intercept = model.params[0]
-    return beta, intercept, model
-
-
-def hedge_ratio_huber(x, y):
-    reg = HuberRegressor().fit(x.values.reshape(-1, 1), y.values)
-    return reg.coef_[0], reg.intercept_
-
-def hedge_ratio_theilsen(x, y):
-    reg = TheilSenRegressor().fit(x.values.reshape(-1, 1), y.values)
-    return reg.coef_[0], reg.intercept_
-
-
-def kalman_hedge_ratio(x, y):
+    # closed-form two-variable OLS - we only ever need slope + intercept,
+    # so no point paying for the full statsmodels results object
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    xm = x.mean()
+    ym = y.mean()
+    dx = x - xm
+    dy = y - ym
+    beta = dx @ dy / (dx @ dx)
+    intercept = ym - beta * xm
+    return beta, intercept
+
+
+def hedge_ratio_huber(x, y, iters=5, c=1.345):
+    # a few IRLS iterations cover the 1-feature case - sklearn's
+    # HuberRegressor runs a full L-BFGS solve for the same answer
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    beta, intercept = np.polyfit(x, y, 1)
+    for _ in range(iters):
+        r = y - (beta * x + intercept)
+        s = 1.4826 * np.median(np.abs(r - np.median(r)))  # robust scale (MAD)
+        if s == 0.0:
+            break
+        w = np.minimum(1.0, c * s / (np.abs(r) + 1e-12))  # Huber weights
+        sw = w.sum()
+        xm = (w * x).sum() / sw
+        ym = (w * y).sum() / sw
+        dx = x - xm
+        beta = (w * dx * (y - ym)).sum() / (w * dx * dx).sum()
+        intercept = ym - beta * xm
+    return beta, intercept
+
+def hedge_ratio_theilsen(x, y, max_pairs=1000, seed=0):
+    # 1-D Theil-Sen is just the median slope over point pairs; sampling
+    # max_pairs of them keeps the cost flat as the tick buffer grows
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    i = rng.integers(0, x.size, max_pairs)
+    j = rng.integers(0, x.size, max_pairs)
+    keep = x[i] != x[j]
+    slopes = (y[j][keep] - y[i][keep]) / (x[j][keep] - x[i][keep])
+    beta = np.median(slopes)
+    intercept = np.median(y - beta * x)
+    return beta, intercept
+
+
+@njit([types.f8[::1](a, types.f8, types.f8) for a in _f8_1d],
+      cache=True, fastmath=True, boundscheck=False)
+def _kalman_1d(obs, Q, R):
+    # scalar random-walk Kalman filter: state 1-D, observation 1-D, so the
+    # whole recursion is one add / multiply / divide per step (no matrices).
+    # no defaults here - omitted arguments don't dispatch against the
+    # explicit signatures, so the wrapper below carries them instead
+    n = obs.size
+    x = np.empty(n)
+    xk = 0.0   # initial state mean
+    Pk = 1.0   # initial state covariance
+    for i in range(n):
+        Pp = Pk + Q
+        K = Pp / (Pp + R)
+        xk = xk + K * (obs[i] - xk)
+        Pk = (1 - K) * Pp
+        x[i] = xk
+    return x
+
+
+def kalman_hedge_ratio(x, y, Q=0.01, R=1.0):
     observations = y.values - x.values
-    kf = KalmanFilter(
-        transition_matrices=[1],
-        observation_matrices=[1],
-        initial_state_mean=0,
-        initial_state_covariance=1,
-        observation_covariance=1,
-        transition_covariance=0.01
-    )
-    state_means, _ = kf.filter(observations)
-    return state_means.flatten()  # time-varying beta
+    return _kalman_1d(observations.astype(np.float64), Q, R)  # time-varying beta
+
+
+@njit([types.UniTuple(types.f8[::1], 2)(a, types.i8, types.i8) for a in _f8_1d],
+      cache=True, fastmath=True, boundscheck=False)
+def _roll_mean_std(a, w, minp):
+    # one pass with running sum / sum-of-squares instead of two separate
+    # rolling ops (add the new value, subtract the one falling out of the window)
+    n = a.size
+    mu = np.full(n, np.nan)
+    sigma = np.full(n, np.nan)
+    s = 0.0
+    ss = 0.0
+    for i in range(n):
+        v = a[i]
+        s += v
+        ss += v * v
+        if i >= w:
+            u = a[i - w]
+            s -= u
+            ss -= u * u
+        nobs = i + 1 if i < w else w
+        if nobs >= minp:
+            var = (ss - s * s / nobs) / (nobs - 1)
+            if var < 0.0:
+                var = 0.0  # guard against tiny negative rounding error
+            mu[i] = s / nobs
+            sigma[i] = np.sqrt(var)
+    return mu, sigma
 
 
 def spread_and_z_score(x, y, beta):
     spread = y - x * beta
-    mu = spread.rolling(window=100, min_periods=10).mean()
-    sigma = spread.rolling(window=100, min_periods=10).std()
-    z = (spread - mu) / sigma
+    mu, sigma = _roll_mean_std(spread.to_numpy(dtype=np.float64), 100, 10)
+    z = pd.Series((spread.to_numpy(dtype=np.float64) - mu) / sigma, index=spread.index)
     return spread, z
 
 
@@ -67,22 +147,63 @@ def adf_test(series):
     }
 
 
+@njit([types.f8[::1](a, b, types.i8) for a in _f8_1d for b in _f8_1d],
+      cache=True, fastmath=True, boundscheck=False)
+def _roll_corr(x, y, w):
+    # running sums of x, y, xx, yy, xy -> O(N) instead of pandas
+    # recomputing the window moments at every step
+    n = x.size
+    out = np.full(n, np.nan)
+    sx = sy = sxx = syy = sxy = 0.0
+    for i in range(n):
+        sx += x[i]
+        sy += y[i]
+        sxx += x[i] * x[i]
+        syy += y[i] * y[i]
+        sxy += x[i] * y[i]
+        if i >= w:
+            j = i - w
+            sx -= x[j]
+            sy -= y[j]
+            sxx -= x[j] * x[j]
+            syy -= y[j] * y[j]
+            sxy -= x[j] * y[j]
+        if i >= w - 1:
+            c = sxy - sx * sy / w
+            vx = sxx - sx * sx / w
+            vy = syy - sy * sy / w
+            if vx > 0.0 and vy > 0.0:
+                out[i] = c / np.sqrt(vx * vy)
+    return out
+
+
 def rolling_corr(x, y, window=60):
-    return x.rolling(window).corr(y)
+    out = _roll_corr(x.to_numpy(dtype=np.float64), y.to_numpy(dtype=np.float64), window)
+    return pd.Series(out, index=x.index)
+
+
+# no fastmath here: the leading z-scores are NaN (min_periods warm-up) and the
+# comparisons must keep IEEE NaN semantics (NaN holds the previous position)
+@njit([types.i1[::1](a, types.f8, types.f8) for a in _f8_1d],
+      cache=True, boundscheck=False)
+def _bt(z, entry, exit_):
+    out = np.empty(z.size, np.int8)
+    pos = 0
+    for i in range(z.size):
+        v = z[i]
+        if v > entry:
+            pos = -1  # Short spread
+        elif v < exit_:
+            pos = 0   # Exit
+        out[i] = pos
+    return out
 
 
 def backtest_mean_reversion(z_scores, entry_threshold=2, exit_threshold=0):
-    position = 0
-    positions = []
-
-    for zscore in z_scores:
-        if zscore > entry_threshold:
-            position = -1  # Short spread
-        elif zscore < exit_threshold:
-            position = 0   # Exit
-        positions.append(position)
-    
-    return pd.Series(positions, index=z_scores.index)
+    # the tick-by-tick loop runs at C speed inside the numba kernel,
+    # first call pays the compile cost once (cached on disk after that)
+    out = _bt(z_scores.to_numpy(dtype=np.float64), float(entry_threshold), float(exit_threshold))
+    return pd.Series(out, index=z_scores.index)
 
 from sqlalchemy import text
 import pandas as pd
@@ -95,9 +216,11 @@ def get_price_series(symbol, engine):
         ORDER BY ts ASC
     """)
     
-    df = pd.read_sql(query, engine, params={"symbol": symbol})
+    # pyarrow backend keeps the result columnar instead of allocating one
+    # Python object per row during materialization
+    df = pd.read_sql(query, engine, params={"symbol": symbol}, dtype_backend="pyarrow")
     df.set_index("ts", inplace=True)
-    
+
     return df["price"]
 
 def get_full_df(symbol, engine):
@@ -108,21 +231,69 @@ def get_full_df(symbol, engine):
         ORDER BY ts ASC
     """)
     
-    df = pd.read_sql(query, engine, params={"symbol": symbol})
+    df = pd.read_sql(query, engine, params={"symbol": symbol}, dtype_backend="pyarrow")
     # df.set_index("ts", inplace=True)
-    
+    # float32 halves the bandwidth through every kernel downstream (the
+    # statsmodels/OLS paths upcast back to float64 where they need it)
+    df = df.astype({'price': 'float32', 'qty': 'float32'})
+
     return df
 
 
+# cache of the last computed analytics per pair, keyed by the newest tick ts
+# the dashboard polls every 5s even when no new trades arrived, so a cheap
+# SELECT max(ts) probe lets us skip the whole recompute when nothing changed
+_analytics_cache = {}
+
+# adfuller is by far the most expensive call in the pipeline (it fits a
+# series of OLS regressions internally), so rerun it at most once a minute.
+# keyed per (symbol1, symbol2) like _analytics_cache - the two pair
+# orderings have different spreads and therefore different ADF results
+_adf_cache = {}
+
+
+def _adf_throttled(symbol1, symbol2, spread):
+    now = time.monotonic()
+    cached = _adf_cache.get((symbol1, symbol2))
+    if cached is not None and now - cached[0] < 60:
+        return cached[1]
+    # downsample to ~2000 points to cap the regression size (the ADF statistic
+    # is stable enough under modest striding for a dashboard readout), and
+    # upcast to float64 for statsmodels - the frames are float32 elsewhere
+    res = adf_test(spread.iloc[::max(1, len(spread) // 2000)].astype(np.float64))
+    _adf_cache[(symbol1, symbol2)] = (now, res)
+    return res
+
+
 # 9. Full Analytics in One Call
 def full_pair_analytics(symbol1, symbol2, engine, window=60):
+    # cheap probe: has anything new arrived for this pair since last time?
+    probe = text("SELECT max(ts) FROM ticks WHERE symbol IN (:a, :b)")
+    with engine.connect() as conn:
+        latest = conn.execute(probe, {"a": symbol1, "b": symbol2}).scalar()
+
+    cached = _analytics_cache.get((symbol1, symbol2))
+    if cached is not None and cached[0] == latest:
+        return cached[1]
+
     # Get price series from DB
-    px_df = get_full_df(symbol1, engine)  
+    px_df = get_full_df(symbol1, engine)
     py_df = get_full_df(symbol2, engine)
-    print(px_df.columns)
+    return full_pair_analytics_from_df(symbol1, symbol2, px_df, py_df, window=window)
+
+
+def full_pair_analytics_from_df(symbol1, symbol2, px_df, py_df, window=60):
+    # same analytics but on frames the caller already fetched (ts/price/qty
+    # columns) - lets the dashboard reuse one shared query instead of
+    # hitting the ticks table again per symbol
     px_df = px_df.drop_duplicates(subset='ts', keep='last')
     py_df = py_df.drop_duplicates(subset='ts', keep='last')
 
+    latest = max(px_df['ts'].iloc[-1], py_df['ts'].iloc[-1])
+    cached = _analytics_cache.get((symbol1, symbol2))
+    if cached is not None and cached[0] == latest:
+        return cached[1]
+
     px = px_df.set_index('ts')['price']
     py = py_df.set_index('ts')['price'] 
 
@@ -133,7 +304,7 @@ def full_pair_analytics(symbol1, symbol2, engine, window=60):
     px, py = data.iloc[:, 0], data.iloc[:, 1]
 
     # OLS regression to compute hedge ratio (beta)
-    beta, intercept, _ = ols_ratio(px, py)
+    beta, intercept = ols_ratio(px, py)
 
     # Compute spread and z-score
     spread, z = spread_and_z_score(px, py, beta)
@@ -141,8 +312,8 @@ def full_pair_analytics(symbol1, symbol2, engine, window=60):
     # Rolling correlation
     rolling_corr_series = rolling_corr(px, py, window=window)
 
-    # ADF test (for stationarity of spread)
-    adf_results = adf_test(spread)
+    # ADF test (for stationarity of spread) - throttled, see _adf_throttled
+    adf_results = _adf_throttled(symbol1, symbol2, spread)
     
     x_stats = stats(px_df)
     y_stats = stats(py_df)
@@ -172,5 +343,6 @@ def full_pair_analytics(symbol1, symbol2, engine, window=60):
         "latest_position": positions.iloc[-1],
     })
 
+    _analytics_cache[(symbol1, symbol2)] = (latest, analytics)
 
     return analytics